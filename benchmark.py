@@ -0,0 +1,275 @@
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from board import GameBoard, ArrayGameBoard
+
+# ------------------------
+# Benchmarks
+# ------------------------
+# Times the GameBoard hot paths on seeded boards, from the 10x15 game up to
+# 2000x2000, at a few mine densities, plus some adversarial layouts. Each
+# case records the median wall time over --repeat runs and the peak memory
+# allocated by one more run under tracemalloc. Board setup is not measured.
+# Runs headless, pygame is never imported:
+#
+#     python benchmark.py                 # compared against benchmark_baseline.json
+#     python benchmark.py --array         # ... against benchmark_baseline_array.json
+#     python benchmark.py --sizes 10x15,500x500 --save mine.json --baseline ''
+#
+# Cases that got slower than --tolerance times the baseline's time are
+# listed and the exit status is 1. The committed baselines were taken with
+# the default sizes, densities and cases on one machine, where repeat runs
+# of a case vary by up to about 1.5x, hence the default tolerance of 2x.
+# After a deliberate change in speed (or to compare more closely on your
+# own machine), refresh them with --save.
+
+SIZES = [(10, 15), (100, 100), (500, 500), (1000, 1000), (2000, 2000)]
+DENSITIES = [0.05, 0.15, 0.25]
+NOISE_FLOOR = 0.001  # seconds; differences below this are never regressions
+TOLERANCE = 2.0  # slowdown over the baseline that counts as a regression; above run-to-run noise
+BASELINES = {"GameBoard": "benchmark_baseline.json", "ArrayGameBoard": "benchmark_baseline_array.json"}
+
+
+def make_board(board_class, width, height, density, seed=0):
+    mines = min(int(width * height * density), width * height - 9)
+    return board_class(width, height, mines, seed=seed)
+
+
+def open_cells(board, rng, n):
+    # reveal n random safe cells (and whatever they flood into) without
+    # ending the game, so there are chunks to work with
+    for _ in range(n):
+        x, y = rng.randrange(board.width), rng.randrange(board.height)
+        if board.grid[y][x] != "M":
+            board.flood_fill(x, y)
+
+
+def first_click(board):
+    board.reveal_tile(board.width // 2, board.height // 2)
+
+
+def flag_line(board, xs=(), ys=()):
+    for x in xs:
+        for y in range(board.height):
+            board._set_flagged(x, y, True)
+    for y in ys:
+        for x in range(board.width):
+            board._set_flagged(x, y, True)
+
+
+# Each setup takes a fresh board and returns the operation to time
+
+
+def setup_calculate_board(board):
+    return lambda: board.calculate_board(board.grid)
+
+
+def setup_reveal_tile(board):
+    return lambda: first_click(board)
+
+
+def setup_chord_tile(board):
+    # a number whose mines are all flagged, next to a hidden empty cell so
+    # the chord floods
+    first_click(board)
+    best = None
+    for y in range(board.height):
+        for x in range(board.width):
+            if not board.revealed[y][x] or board.grid[y][x] in (0, "M"):
+                continue
+            hidden = [(nx, ny) for nx, ny in board.adjacent_mines(x, y) if not board.revealed[ny][nx]]
+            safe = [(nx, ny) for nx, ny in hidden if board.grid[ny][nx] != "M"]
+            if safe:
+                best = (x, y, hidden)
+                if any(board.grid[ny][nx] == 0 for nx, ny in safe):
+                    break
+        else:
+            continue
+        break
+    if best is None:
+        return lambda: None
+    x, y, hidden = best
+    for nx, ny in hidden:
+        if board.grid[ny][nx] == "M":
+            board.flag_tile(nx, ny)
+    return lambda: board.chord_tile(x, y)
+
+
+def setup_blast(board):
+    flag_line(board, xs=[board.width // 2], ys=[board.height // 2])
+    return board.blast
+
+
+def setup_identify_chunks(board):
+    first_click(board)
+    open_cells(board, random.Random(0), board.width * board.height // 100 + 1)
+    board.chunk_index.reset()  # time the labelling too, not just the read-out
+    return board.identify_chunks
+
+
+def setup_enact_gravity(board):
+    first_click(board)
+    open_cells(board, random.Random(0), board.width * board.height // 100 + 1)
+    board.chunk_index.labels()
+    return board.enact_gravity
+
+
+OPERATIONS = {
+    "calculate_board": setup_calculate_board,
+    "reveal_tile": setup_reveal_tile,
+    "chord_tile": setup_chord_tile,
+    "blast": setup_blast,
+    "identify_chunks": setup_identify_chunks,
+    "enact_gravity": setup_enact_gravity,
+}
+
+
+# Adversarial layouts: (operation, density, setup)
+
+
+def setup_empty_flood(board):
+    # no mines at all: the first click opens the whole board
+    return lambda: first_click(board)
+
+
+def open_lattice(board):
+    # revealed lines every third row and column leave a checkerboard of
+    # 2x2 hidden chunks, the most chunks gravity can be asked to handle
+    for y in range(board.height):
+        for x in range(board.width):
+            if x % 3 == 2 or y % 3 == 2:
+                board.revealed[y][x] = True
+
+
+def setup_checkerboard_chunks(board):
+    open_lattice(board)
+    return board.identify_chunks
+
+
+def setup_checkerboard_gravity(board):
+    open_lattice(board)
+    board.chunk_index.labels()
+    return board.enact_gravity
+
+
+def setup_column_blast(board):
+    # every fourth column full of flags, blasted at once
+    flag_line(board, xs=range(0, board.width, 4))
+    return board.blast
+
+
+ADVERSARIAL = {
+    "empty_flood": ("reveal_tile", 0.0, setup_empty_flood),
+    "checkerboard_chunks": ("identify_chunks", 0.15, setup_checkerboard_chunks),
+    "checkerboard_gravity": ("enact_gravity", 0.15, setup_checkerboard_gravity),
+    "column_blast": ("blast", 0.15, setup_column_blast),
+}
+
+
+def measure(board_class, width, height, density, setup, repeat):
+    samples = []
+    for _ in range(repeat):
+        operation = setup(make_board(board_class, width, height, density))
+        # as timeit does: no collection of the setup's garbage in the timed part
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    operation = setup(make_board(board_class, width, height, density))
+    tracemalloc.start()
+    try:
+        operation()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": statistics.median(samples), "peak_kb": peak / 1024}
+
+
+def cases(sizes, densities, operations, adversarial):
+    for width, height in sizes:
+        for name in operations:
+            for density in densities:
+                yield f"{name}/{width}x{height}/{density}", width, height, density, OPERATIONS[name]
+        for name in adversarial:
+            operation, density, setup = ADVERSARIAL[name]
+            yield f"{name}/{width}x{height}", width, height, density, setup
+
+
+def run(board_class, sizes, densities, operations, adversarial, repeat, verbose=True):
+    results = {}
+    for key, width, height, density, setup in cases(sizes, densities, operations, adversarial):
+        # the biggest boards take long enough to set up that one run will do
+        runs = repeat if width * height <= 1_000_000 else 1
+        results[key] = measure(board_class, width, height, density, setup, runs)
+        if verbose:
+            print(f"{key:40} {1000 * results[key]['seconds']:10.3f}ms {results[key]['peak_kb']:12.1f}KB",
+                  flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Returns the cases that got slower than tolerance x the baseline
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if result["seconds"] > old["seconds"] * tolerance and result["seconds"] - old["seconds"] > NOISE_FLOOR:
+            regressions.append((key, old["seconds"], result["seconds"]))
+    return regressions
+
+
+def parse_sizes(text):
+    return [tuple(int(n) for n in size.split("x")) for size in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the GameBoard hot paths.")
+    parser.add_argument("--sizes", type=parse_sizes, default=SIZES, help="e.g. 10x15,1000x1000")
+    parser.add_argument("--densities", type=lambda s: [float(d) for d in s.split(",")], default=DENSITIES)
+    parser.add_argument("--ops", type=lambda s: s.split(","), default=list(OPERATIONS),
+                        help=f"any of {','.join(OPERATIONS)}")
+    parser.add_argument("--adversarial", type=lambda s: s.split(",") if s else [], default=list(ADVERSARIAL),
+                        help=f"any of {','.join(ADVERSARIAL)}, or '' for none")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--array", action="store_true", help="use the numpy-backed board")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="compare against a saved baseline ('' for none); defaults to the committed one")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="slowdown factor over the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    board_class = ArrayGameBoard if args.array else GameBoard
+    if args.baseline is None:
+        args.baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), BASELINES[board_class.__name__])
+    results = run(board_class, args.sizes, args.densities, args.ops, args.adversarial, args.repeat)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"board": board_class.__name__, "results": results}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["board"] != board_class.__name__:
+            print(f"warning: baseline was taken with {baseline['board']}")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: {1000 * old:.3f}ms -> {1000 * new:.3f}ms ({new / old:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
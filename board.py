@@ -0,0 +1,1134 @@
+import bisect
+import collections
+import functools
+import heapq
+import random
+
+import tracing
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for ArrayGameBoard
+    np = None
+
+# ------------------------
+# Game Logic (no rendering)
+# ------------------------
+
+RELOCATE_TRIES = 32  # random picks for a free cell before listing them all
+
+
+def max_mines(width, height):
+    # the first click always opens a mine-free 3x3 neighborhood
+    return max(width * height - min(width, 3) * min(height, 3), 0)
+
+
+@functools.lru_cache(maxsize=8)
+def neighbor_tables(width, height):
+    # Neighbor tables for 8- and 4-connectivity, indexed by the flat cell
+    # index y * width + x and shared by every board of the same size. An entry
+    # is a tuple of (dx, dy, offset) steps, offset being the flat distance
+    # dy * width + dx. Cells with the same in-bounds neighbors share a tuple,
+    # so a table costs one pointer per cell.
+    def steps(x, y, plus):
+        return tuple((dx, dy, dy * width + dx)
+                     for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                     if (dx or dy) and not (plus and dx and dy)
+                     and 0 <= x + dx < width and 0 <= y + dy < height)
+
+    tables = []
+    for plus in (False, True):
+        interior = steps(1, 1, plus) if width > 2 and height > 2 else None
+        table = [interior] * (width * height)
+        by_border = {}
+        for y in range(height):
+            xs = range(width) if interior is None or y in (0, height - 1) else (0, width - 1)
+            for x in xs:
+                border = (x == 0, x == width - 1, y == 0, y == height - 1)
+                if border not in by_border:
+                    by_border[border] = steps(x, y, plus)
+                table[y * width + x] = by_border[border]
+        tables.append(table)
+    return tables
+
+
+def strongly_connected(edges):
+    # Tarjan's algorithm without recursion; edges[i] lists the nodes i points to
+    index = [None] * len(edges)
+    lowlink = [0] * len(edges)
+    on_stack = [False] * len(edges)
+    stack = []
+    components = []
+    counter = 0
+    for root in range(len(edges)):
+        if index[root] is not None:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, k = work.pop()
+            if k == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            if k < len(edges[node]):
+                work.append((node, k + 1))
+                nxt = edges[node][k]
+                if index[nxt] is None:
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    lowlink[node] = min(lowlink[node], index[nxt])
+                continue
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+    return components
+
+
+
+class GameBoard:
+    def __init__(self, width, height, initial_mines, seed=None, mines=None):
+        # mines: flat indices (y * width + x) of the mines, to rebuild a saved
+        # board instead of sampling a new one
+        if initial_mines > max_mines(width, height):
+            raise ValueError(f"Too many mines for a {width}x{height} board: {initial_mines}")
+        self.width = width
+        self.height = height
+        self.initial_mines = initial_mines
+        self.rng = random.Random(seed)
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.rows = RowSupply(width, initial_mines // height, seed)
+        self.neighbors8, self.neighbors4 = neighbor_tables(width, height)
+        self.grid = self._generate_initial_board(positions=mines)
+        self.revealed = self._new_layer()
+        self.flagged = self._new_layer()
+        self._count_flags()
+        self.dirty = set()  # cells whose contents changed since the last recount
+        self.chunk_index = ChunkIndex(self)
+        self.watchers = []  # sets collecting cells whose look changed, see watch()
+        self.first_click = True
+        self.game_over = False
+        self.score = 0
+
+
+    def _new_layer(self):
+        return [[False]*self.width for _ in range(self.height)]
+
+    def watch(self):
+        # Returns a set that from now on collects every cell whose look
+        # changes (revealed, flagged, moved or renumbered). The caller empties
+        # it as it catches up, e.g. the renderer once per frame.
+        changed = set()
+        self.watchers.append(changed)
+        return changed
+
+    def _touch(self, cells):
+        for changed in self.watchers:
+            changed.update(cells)
+
+    def _touch_around(self, cells):
+        # the cells and their neighbors, whose numbers may have changed
+        if not self.watchers:
+            return
+        touched = set()
+        for x, y in cells:
+            touched.add((x, y))
+            for dx, dy, d in self.neighbors8[y * self.width + x]:
+                touched.add((x + dx, y + dy))
+        self._touch(touched)
+
+    def _generate_initial_board(self, positions=None):
+        if positions is None:
+            positions = self._sample_mines()
+        board = [[0] * self.width for _ in range(self.height)]
+        for p in positions:
+            board[p // self.width][p % self.width] = "M"
+        self.calculate_board(board)
+        return board
+
+    def _sample_mines(self):
+        # Pick all mine positions (flat indices) in one pass; the first click
+        # is made safe afterwards by _clear_around
+        return self.rng.sample(range(self.width * self.height), self.initial_mines)
+
+    def get_score(self):
+        return self.score
+
+    def calculate_board(self, board):
+        mines = [cell == "M" for row in board for cell in row]
+        for y, row in enumerate(board):
+            i = y * self.width
+            for x in range(self.width):
+                if mines[i + x]:
+                    continue
+                count = 0
+                for dx, dy, d in self.neighbors8[i + x]:
+                    if mines[i + x + d]:
+                        count += 1
+                row[x] = count
+        return board
+
+    def recount_dirty(self):
+        # Recount only the 3x3 neighborhoods of cells that changed since the
+        # last recount, instead of the whole board
+        to_count = set()
+        for x, y in self.dirty:
+            i = y * self.width + x
+            to_count.add(i)
+            for dx, dy, d in self.neighbors8[i]:
+                to_count.add(i + d)
+        self.dirty.clear()
+        tracing.count("recount_cells", len(to_count))
+        if self.watchers:
+            self._touch((i % self.width, i // self.width) for i in to_count)
+        for i in to_count:
+            y, x = i // self.width, i % self.width
+            if self.grid[y][x] == "M":
+                continue
+            count = 0
+            for dx, dy, d in self.neighbors8[i]:
+                if self.grid[y + dy][x + dx] == "M":
+                    count += 1
+            self.grid[y][x] = count
+
+    def _count_flags(self):
+        # per-row and per-column flag counters, so full lines are known
+        # without scanning the board
+        self.row_flags = [0] * self.height
+        self.col_flags = [0] * self.width
+        self.full_rows = set()
+        self.full_cols = set()
+        for y in range(self.height):
+            for x in range(self.width):
+                if self.flagged[y][x]:
+                    self._count_flag(x, y, 1)
+
+    def _count_flag(self, x, y, delta):
+        self.row_flags[y] += delta
+        self.col_flags[x] += delta
+        if self.row_flags[y] == self.width:
+            self.full_rows.add(y)
+        else:
+            self.full_rows.discard(y)
+        if self.col_flags[x] == self.height:
+            self.full_cols.add(x)
+        else:
+            self.full_cols.discard(x)
+
+    def _set_flagged(self, x, y, flagged):
+        if bool(self.flagged[y][x]) != flagged:
+            self.flagged[y][x] = flagged
+            self._count_flag(x, y, 1 if flagged else -1)
+            self._touch(((x, y),))
+
+    def blast(self):
+        for _ in self.blast_steps():
+            pass
+
+    def blast_steps(self):
+        # blast() one line at a time, yielding after each so a caller can
+        # keep drawing in between
+        to_blast_x = sorted(self.full_cols)
+        to_blast_y = sorted(self.full_rows)
+        self.score += self.height * len(to_blast_x) + self.width * len(to_blast_y)
+        lines = [[(x, y) for y in range(self.height)] for x in to_blast_x]
+        lines += [[(x, y) for x in range(self.width)] for y in to_blast_y]
+        done = set()
+        for line in lines:
+            blasted = []
+            for x, y in line:
+                if (x, y) in done:
+                    continue  # where a row crosses a column
+                done.add((x, y))
+                if not self.revealed[y][x]:
+                    blasted.append((x, y))
+                self.revealed[y][x] = True
+                self._set_flagged(x, y, False)
+                if self.grid[y][x] == "M":
+                    self.grid[y][x] = "0"
+                    self.dirty.add((x, y))
+                else:
+                    self.game_over = True
+            self.chunk_index.reveal(blasted)
+            self.recount_dirty()
+            yield
+
+    def print_grid(self):
+        print("\nCurrent Grid:")
+        for y, row in enumerate(self.grid):
+            row_str = ""
+            for x, cell in enumerate(row):
+                if self.revealed[y][x]:
+                    if self.flagged[y][x]:
+                        row_str += "F"  # flagged
+                    else:
+                        row_str += str(cell)  # show actual value
+                else:
+                    row_str += "#"  # unrevealed
+            print(row_str)
+        print("-" * self.width)
+
+
+
+    def enact_gravity(self):
+        # Settle everything in one pass: work out how far each chunk ends up
+        # falling, then move each cell once
+        with tracing.span("enact_gravity"):
+            with tracing.span("settle_drops"):
+                groups, drops = self.settle_drops()
+            tracing.count("chunks_found", len(groups))
+            with tracing.span("drop_chunks"):
+                self.drop_chunks(groups, drops)
+            with tracing.span("recount"):
+                self.recount_dirty()
+
+    def settle_drops(self):
+        # Returns (groups, drops): groups[i] lists the chunk labels that fall
+        # together by drops[i]. groups[0] is the top chunk, which also drags
+        # down the endless supply of rows above the board that encroach feeds
+        # in (even when it is empty).
+        # Each chunk's drop is capped by the floor and by whatever is below
+        # each of its columns: drop[i] <= drop[j] + gap. The largest drops
+        # that satisfy all of these are shortest paths up from the floor.
+        labels = self.chunk_index.labels()
+        top_labels = self.chunk_index.top_labels()
+        groups = [sorted(top_labels)]
+        node = {lab: 0 for lab in top_labels}
+        for lab in self.chunk_index.cells:
+            if lab not in node:
+                node[lab] = len(groups)
+                groups.append([lab])
+        no_drop = self.height + 1
+        floor = [no_drop] * len(groups)
+        above = [[] for _ in groups]  # above[j]: (i, gap) for chunks resting on j
+        for x in range(self.width):
+            below, below_y = None, self.height
+            for y in range(self.height - 1, -2, -1):
+                if y < 0:
+                    i = 0
+                elif labels[y][x]:
+                    i = node[labels[y][x]]
+                else:
+                    continue  # revealed
+                gap = below_y - y - 1
+                if below is None:
+                    floor[i] = min(floor[i], gap)
+                elif below != i:
+                    above[below].append((i, gap))
+                below, below_y = i, y
+
+        # chunks that hold each other up with no gap (say a flag sitting inside
+        # a hidden region) can never fall one at a time, so they stay put
+        resting_on = [[] for _ in groups]
+        for j, resting in enumerate(above):
+            for i, gap in resting:
+                if gap == 0:
+                    resting_on[i].append(j)
+        for component in strongly_connected(resting_on):
+            if len(component) > 1:
+                for i in component:
+                    floor[i] = 0
+
+        drops = floor[:]
+        heap = [(drop, i) for i, drop in enumerate(drops) if drop < no_drop]
+        heapq.heapify(heap)
+        while heap:
+            drop, j = heapq.heappop(heap)
+            if drop > drops[j]:
+                continue
+            for i, gap in above[j]:
+                if drop + gap < drops[i]:
+                    drops[i] = drop + gap
+                    heapq.heappush(heap, (drop + gap, i))
+        return groups, drops
+
+    def gravity_steps(self, animate=True):
+        # enact_gravity() in steps, yielding between them so a caller can keep
+        # drawing. With animate, every step drops the chunks that still have
+        # further to go by one row, so they are seen settling. The drops
+        # never make a chunk pass through one below it (drop[i] <= drop[j] +
+        # gap holds for the part fallen so far too), so every step is a
+        # valid board, and the end state is the same as enact_gravity's.
+        # The chunk index is only brought up to date at the end.
+        groups, drops = self.settle_drops()
+        yield
+        if not animate:
+            self.drop_chunks(groups, drops)
+            self.recount_dirty()
+            return
+        moves = self._falling_cells(groups, drops)
+        tracing.count("cells_moved", len(moves))
+        tracing.count("rows_encroached", drops[0])
+        for step in range(max(drops)):
+            step_moves = [(x, y + step, 1) for x, y, drop in moves if drop > step]
+            if step < drops[0]:
+                # the rows pulled in so far fall with the top chunk
+                step_moves.extend((x, y, 1) for y in range(step) for x in range(self.width))
+            self._move_cells(step_moves)
+            if step < drops[0]:
+                self._new_rows(1)
+            self.recount_dirty()
+            yield
+        self.chunk_index.move(moves)
+        if drops[0]:
+            self.chunk_index.hide([(x, y) for y in range(drops[0]) for x in range(self.width)])
+
+    def _falling_cells(self, groups, drops):
+        # (x, y, drop) for every cell that falls
+        moves = []
+        for labels, drop in zip(groups, drops):
+            if drop:
+                for lab in labels:
+                    moves.extend((x, y, drop) for x, y in self.chunk_index.cells[lab])
+        return moves
+
+    def drop_chunks(self, groups, drops):
+        moves = self._falling_cells(groups, drops)
+        tracing.count("cells_moved", len(moves))
+        tracing.count("rows_encroached", drops[0])
+        self._move_cells(moves)
+        self.chunk_index.move(moves)
+        # the top chunk pulls in one new row per row it fell
+        self._new_rows(drops[0])
+        if drops[0]:
+            self.chunk_index.hide([(x, y) for y in range(drops[0]) for x in range(self.width)])
+
+    def _move_cells(self, moves):
+        # Lift every falling cell out first, then put them all back down, so
+        # the order of the moves doesn't matter
+        moving = [(self.grid[y][x], self.flagged[y][x]) for x, y, drop in moves]
+        for x, y, drop in moves:
+            self.grid[y][x] = 0
+            self.revealed[y][x] = True
+            self._set_flagged(x, y, False)
+            self.dirty.add((x, y))
+        for (x, y, drop), (cell, flagged) in zip(moves, moving):
+            self.grid[y + drop][x] = cell
+            self.revealed[y + drop][x] = False
+            self._set_flagged(x, y + drop, bool(flagged))
+            self.dirty.add((x, y + drop))
+
+    def _new_rows(self, n):
+        # fill rows 0 .. n-1 with fresh rows, the first one made ending up
+        # lowest (it is the one that has come furthest down)
+        for y in range(n - 1, -1, -1):
+            self.grid[y] = self._new_row()
+            self.revealed[y] = [False]*self.width
+            for x in range(self.width):
+                self._set_flagged(x, y, False)  # keeps the row / column flag counts right
+            self.dirty.update((x, y) for x in range(self.width))
+
+    def encroach(self, top_chunk=None):
+        if top_chunk is None:
+            top_chunk = set()
+        # check if row 0 is entirely revealed:
+        if not all(self.revealed[0]):
+            raise ValueError("Trying to encroach when top row not fully revealed")
+        self.grid[0] = self._new_row()
+        self.revealed[0] = [False]*self.width
+        for x in range(self.width):
+            self._set_flagged(x, 0, False)
+        self.dirty.update((x, 0) for x in range(self.width))
+        self.chunk_index.hide([(x, 0) for x in range(self.width)])
+        # self.grid = self.calculate_board(self.grid)
+
+        # if any chunk touches the top row, add this row to it
+        # previous steps made sure only one chunk can touch top row
+        # top_chunks = [c for c in chunks if any(y == 1 for x, y in c)]
+        # if len(top_chunks) > 1: print("CATASTROPHE 2")
+        kerchunk = set([(x, 0) for x in range(self.width)])
+        tracing.count("rows_encroached")
+        # for c in top_chunks:
+        #         kerchunk.update(c)
+        #         chunks.remove(c)
+        top_chunk.update(kerchunk)
+        return top_chunk
+
+    def _new_row(self):
+        return self.rows.pull()
+
+    def cheat(self):
+        for y in range(self.height):
+            for x in range(self.width):
+                if self.grid[y][x] != "M":
+                    self.revealed[y][x] = True
+                else:
+                    self._set_flagged(x, y, True)
+        self.chunk_index.reset()
+        self._touch((x, y) for y in range(self.height) for x in range(self.width))
+        self.recount_dirty()
+
+    def fall_chunk(self, chunk):
+        # input("Press Enter to step...")
+        # self.print_grid()
+        new_chunk = set()
+        tracing.count("cells_moved", len(chunk))
+        self.chunk_index.move([(x, y, 1) for x, y in chunk])
+        # Move all cells in chunk down by 1
+        for x, y in sorted(chunk, key=lambda c: -c[1]):  # Sort by y descending
+            if self.revealed[y][x]:
+                tracing.logger.error("fall_chunk: trying to move revealed cell %d, %d", x, y)
+                raise ValueError("Trying to move revealed cell")
+            if not self.revealed[y + 1][x]:
+                tracing.logger.warning("fall_chunk: trying to move into non-revealed cell %d, %d", x, y + 1)
+            self.grid[y + 1][x] = self.grid[y][x]
+            self.revealed[y + 1][x] = self.revealed[y][x]
+            self._set_flagged(x, y + 1, bool(self.flagged[y][x]))
+            self.grid[y][x] = 0
+            self.revealed[y][x] = True
+            self._set_flagged(x, y, False)
+            self.dirty.add((x, y))
+            self.dirty.add((x, y + 1))
+            new_chunk.add((x, y + 1))
+        chunk.clear()
+        chunk.update(new_chunk)
+            
+
+    
+
+    def can_fall(self, chunk):
+        for x, y in chunk:
+            if y + 1 >= self.height:
+                return False
+            # can fall if space below is unrevealed or within same chunk
+            if not (self.revealed[y + 1][x] or (x, y + 1) in chunk):
+                return False
+        return True
+
+    def identify_chunks(self):
+        # read the chunks off the index instead of relabelling the board
+        with tracing.span("identify_chunks"):
+            top_labels = self.chunk_index.top_labels()
+            top_chunk = set()
+            chunks = []
+            for lab, cells in self.chunk_index.cells.items():
+                if lab in top_labels:
+                    top_chunk.update(cells)
+                else:
+                    chunks.append(set(cells))
+        tracing.count("chunks_found", len(chunks))
+        return top_chunk, chunks
+
+    def reveal_tile(self, x, y):
+        if self.first_click and self.grid[y][x] != 0:
+            self._clear_around(x, y)
+        if self.revealed[y][x] or self.flagged[y][x]:
+            return True  # No action if already revealed or flagged`
+        self.flood_fill(x, y)
+        if self.grid[y][x] == "M":
+            self.game_over = True
+            return "M"
+        # if self.gravity:
+        #     self.enact_gravity()
+
+        self.first_click = False
+
+        return self.grid[y][x]
+
+    def _clear_around(self, x, y):
+        # Make (x, y) a 0 by moving the mines in its 3x3 neighborhood to
+        # random free cells outside it, instead of generating a new board. A
+        # free cell is hidden, unflagged and not a mine: cells can already be
+        # open before the first click (a blast, cheat()).
+        area = {(x, y), *self.adjacent_mines(x, y)}
+
+        def free_cell(tx, ty):
+            return ((tx, ty) not in area and self.grid[ty][tx] != "M"
+                    and not self.revealed[ty][tx] and not self.flagged[ty][tx])
+
+        free = None  # all candidate cells, only listed if guessing keeps missing
+        for cx, cy in [(cx, cy) for cx, cy in area if self.grid[cy][cx] == "M"]:
+            for _ in range(RELOCATE_TRIES if free is None else 0):
+                i = self.rng.randrange(self.width * self.height)
+                tx, ty = i % self.width, i // self.width
+                if free_cell(tx, ty):
+                    break
+            else:
+                if free is None:
+                    free = [(tx, ty) for ty in range(self.height) for tx in range(self.width) if free_cell(tx, ty)]
+                if not free:
+                    break  # nowhere to put the rest; they stay
+                tx, ty = free.pop(self.rng.randrange(len(free)))
+            self.grid[cy][cx] = 0
+            self.grid[ty][tx] = "M"
+            self.dirty.update(((cx, cy), (tx, ty)))
+        self.recount_dirty()
+
+    def flood_fill(self, x, y):
+        # Returns the newly revealed cells as row runs (y, x0, x1), x1
+        # exclusive; they are only listed cell by cell if something needs them
+        opened = self._flood_fill(x, y)
+        if self.watchers or self.chunk_index.label is not None:
+            cells = list(run_cells(opened))
+            self.chunk_index.reveal(cells)
+            self._touch(cells)
+        return opened
+
+    def _flood_fill(self, x, y):
+        # Reveal (x, y); if it is a 0, also reveal the connected region of
+        # hidden 0s and their numbered border. Scanline: a run of walkable
+        # cells (hidden, unflagged, 0) is opened in one go with its two ends,
+        # then the rows above and below are scanned over the same span (plus
+        # one for the diagonals) for border cells and walkable cells to start
+        # new runs from. Flagged cells are left alone.
+        revealed, flagged, grid = self.revealed, self.flagged, self.grid
+        width, height = self.width, self.height
+        if revealed[y][x]:
+            return []
+        if grid[y][x] != 0:
+            revealed[y][x] = True
+            return [(y, x, x + 1)]
+        opened = []
+        stack = [(x, y)]
+        while stack:
+            sx, sy = stack.pop()
+            row_revealed, row_flagged, row = revealed[sy], flagged[sy], grid[sy]
+            if row_revealed[sx]:
+                continue  # already opened as part of another run
+            s = sx
+            while s > 0 and not row_revealed[s - 1] and not row_flagged[s - 1] and row[s - 1] == 0:
+                s -= 1
+            e = sx + 1
+            while e < width and not row_revealed[e] and not row_flagged[e] and row[e] == 0:
+                e += 1
+            a = s - 1 if s > 0 and not row_revealed[s - 1] and not row_flagged[s - 1] else s
+            b = e + 1 if e < width and not row_revealed[e] and not row_flagged[e] else e
+            row_revealed[a:b] = [True] * (b - a)
+            opened.append((sy, a, b))
+            for ny in (sy - 1, sy + 1):
+                if not 0 <= ny < height:
+                    continue
+                next_revealed, next_flagged, next_row = revealed[ny], flagged[ny], grid[ny]
+                nx, end = max(s - 1, 0), min(e + 1, width)
+                while nx < end:
+                    if next_revealed[nx]:
+                        try:
+                            nx = next_revealed.index(False, nx, end)
+                        except ValueError:
+                            break
+                    if next_flagged[nx]:
+                        nx += 1
+                    elif next_row[nx] == 0:
+                        # the start of a run; skip to its end
+                        stack.append((nx, ny))
+                        nx += 1
+                        while nx < end and not next_revealed[nx] and not next_flagged[nx] and next_row[nx] == 0:
+                            nx += 1
+                    else:
+                        next_revealed[nx] = True
+                        opened.append((ny, nx, nx + 1))
+                        nx += 1
+        return opened
+
+    def space_bar_tile(self, x, y):
+        if not self.revealed[y][x]:
+            self.flag_tile(x, y)
+            return "Flagged:", x, y
+        else:
+            # if mines are mislabeled, chording can hit a mine
+            if self.chord_tile(x, y) == "M":
+                return "M"
+            else:
+                return "Chorded:", x, y
+
+    def chord_tile(self, x, y):
+        if self.revealed[y][x] and self.grid[y][x] > 0:
+            neighbors = self.neighbors8[y * self.width + x]
+            flagged_count = 0
+            for dx, dy, d in neighbors:
+                if self.flagged[y + dy][x + dx]:
+                    flagged_count += 1
+            if flagged_count == self.grid[y][x]:
+                for dx, dy, d in neighbors:
+                    nx, ny = x + dx, y + dy
+                    if not self.revealed[ny][nx] and not self.flagged[ny][nx]:
+                        result = self.reveal_tile(nx, ny)
+                        if result == "M":
+                            self.game_over = True
+                            return "M"
+        return True
+                        
+
+    def flag_tile(self, x, y):
+        if not self.revealed[y][x]:
+             self._set_flagged(x, y, not self.flagged[y][x])
+             self.chunk_index.flag(x, y)
+
+
+    def __str__(self):
+        return "\n".join(str(row) for row in self.grid)
+
+    def adjacent_mines(self, x, y, plus=False):
+        table = self.neighbors4 if plus else self.neighbors8
+        return [(x + dx, y + dy) for dx, dy, d in table[y * self.width + x]]
+
+    def shown_cells(self):
+        # cells that are revealed or flagged, i.e. don't look hidden
+        return [(x, y) for y in range(self.height) for x in range(self.width)
+                if self.revealed[y][x] or self.flagged[y][x]]
+
+
+def run_cells(runs):
+    # the (x, y) cells of row runs (y, x0, x1)
+    for y, x0, x1 in runs:
+        for x in range(x0, x1):
+            yield x, y
+
+
+def neighbor_counts(mines):
+    # 3x3 neighbor sum over a boolean mine array, in one vectorized pass
+    h, w = mines.shape
+    padded = np.pad(mines, 1).view(np.uint8)
+    counts = np.zeros((h, w), dtype=np.uint8)
+    for dy in range(3):
+        for dx in range(3):
+            if dy == 1 and dx == 1:
+                continue
+            counts += padded[dy:dy + h, dx:dx + w]
+    counts[mines] = 0
+    return counts
+
+
+class ArrayGameBoard(GameBoard):
+    # Same game as GameBoard, but stored as numpy arrays:
+    #   mines    bool  (height, width)
+    #   counts   uint8 (height, width), 0 under mines
+    #   revealed bool  (height, width)
+    #   flagged  bool  (height, width)
+    # self.grid is a view that still reads as ints / "M", so the renderer and
+    # the inherited per-cell logic keep working unchanged.
+    def __init__(self, width, height, initial_mines, seed=None, mines=None):
+        if np is None:
+            raise ImportError("ArrayGameBoard requires numpy")
+        self.mines = np.zeros((height, width), dtype=bool)
+        self.counts = np.zeros((height, width), dtype=np.uint8)
+        super().__init__(width, height, initial_mines, seed, mines)
+
+    @property
+    def grid(self):
+        return _GridView(self)
+
+    @grid.setter
+    def grid(self, board):
+        if isinstance(board, _GridView):
+            return  # already backed by self.mines / self.counts
+        self.mines = np.array([[cell == "M" for cell in row] for row in board], dtype=bool)
+        self.counts = neighbor_counts(self.mines)
+
+    def _new_layer(self):
+        return np.zeros((self.height, self.width), dtype=bool)
+
+    def _generate_initial_board(self, positions=None):
+        if positions is None:
+            positions = self._sample_mines()
+        self.mines = np.zeros((self.height, self.width), dtype=bool)
+        self.mines.flat[positions] = True
+        return self.calculate_board(self.grid)
+
+    def calculate_board(self, board):
+        if not isinstance(board, _GridView):
+            return super().calculate_board(board)
+        self.counts = neighbor_counts(self.mines)
+        return board
+
+    def shown_cells(self):
+        ys, xs = np.nonzero(self.revealed | self.flagged)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def _count_flags(self):
+        self.row_flags = self.flagged.sum(axis=1).tolist()
+        self.col_flags = self.flagged.sum(axis=0).tolist()
+        self.full_rows = {y for y, n in enumerate(self.row_flags) if n == self.width}
+        self.full_cols = {x for x, n in enumerate(self.col_flags) if n == self.height}
+
+    def blast(self):
+        # Only the cells on the full lines are gathered and cleared
+        rows = sorted(self.full_rows)
+        cols = sorted(self.full_cols)
+        other_rows = np.setdiff1d(np.arange(self.height), rows)
+        ys = np.concatenate([np.repeat(rows, self.width), np.tile(other_rows, len(cols))]).astype(np.intp)
+        xs = np.concatenate([np.tile(np.arange(self.width), len(rows)), np.repeat(cols, len(other_rows))]).astype(np.intp)
+        if not self.mines[ys, xs].all():
+            self.game_over = True
+        hidden = ~self.revealed[ys, xs]
+        flags = self.flagged[ys, xs]
+        self.revealed[ys, xs] = True
+        self.flagged[ys, xs] = False
+        self.mines[ys, xs] = False
+        for x, y in zip(xs[flags].tolist(), ys[flags].tolist()):
+            self._count_flag(x, y, -1)
+        self.chunk_index.reveal(zip(xs[hidden].tolist(), ys[hidden].tolist()))
+        self._touch_around(zip(xs.tolist(), ys.tolist()))
+        self.score += self.height * len(cols) + self.width * len(rows)
+        for y in rows:
+            self._recount_window(y - 1, y + 2, 0, self.width)
+        for x in cols:
+            self._recount_window(0, self.height, x - 1, x + 2)
+
+    def blast_steps(self):
+        # the vectorized blast is quick enough to run in one go
+        self.blast()
+        yield
+
+    def cheat(self):
+        self.revealed[~self.mines] = True
+        self.flagged[self.mines] = True
+        self._count_flags()
+        self.chunk_index.reset()
+        self._touch((x, y) for y in range(self.height) for x in range(self.width))
+        self.recount_dirty()
+
+    def _flood_fill(self, x, y):
+        # Label only the region that was clicked: walkable cells (hidden,
+        # unflagged, 0) are split into horizontal runs, one row at a time as
+        # the walk reaches it, and runs that touch (8-connected) are joined.
+        if self.revealed[y, x]:
+            return []
+        if self.mines[y, x] or self.counts[y, x]:
+            self.revealed[y, x] = True
+            return [(y, x, x + 1)]
+        runs = {}  # row -> (starts, ends), ends exclusive
+
+        def row_runs(r):
+            if r not in runs:
+                walkable = ~self.revealed[r] & ~self.flagged[r] & ~self.mines[r] & (self.counts[r] == 0)
+                edges = np.diff(np.concatenate(([0], walkable.view(np.int8), [0])))
+                runs[r] = (np.nonzero(edges == 1)[0].tolist(), np.nonzero(edges == -1)[0].tolist())
+            return runs[r]
+
+        starts, ends = row_runs(y)
+        first = (y, bisect.bisect_right(starts, x) - 1)
+        seen = {first}
+        stack = [first]
+        region = np.zeros((self.height, self.width), dtype=bool)
+        while stack:
+            r, i = stack.pop()
+            starts, ends = runs[r]
+            s, e = starts[i], ends[i]
+            region[max(r - 1, 0):r + 2, max(s - 1, 0):e + 1] = True
+            for nr in (r - 1, r + 1):
+                if not 0 <= nr < self.height:
+                    continue
+                # runs in the next row that overlap [s - 1, e]
+                next_starts, next_ends = row_runs(nr)
+                j = bisect.bisect_left(next_ends, s)
+                while j < len(next_starts) and next_starts[j] <= e:
+                    if (nr, j) not in seen:
+                        seen.add((nr, j))
+                        stack.append((nr, j))
+                    j += 1
+        region &= ~self.revealed & ~self.flagged
+        self.revealed |= region
+        # the region's row runs, read off the edges of each padded row
+        edges = np.diff(np.pad(region.view(np.int8), ((0, 0), (1, 1))), axis=1)
+        ys, starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)[1]
+        return list(zip(ys.tolist(), starts.tolist(), ends.tolist()))
+
+    def recount_dirty(self):
+        # Vectorized recount of the bounding box around the changed cells
+        if not self.dirty:
+            return
+        xs = [x for x, y in self.dirty]
+        ys = [y for x, y in self.dirty]
+        self._touch_around(self.dirty)
+        self.dirty.clear()
+        self._recount_window(min(ys) - 1, max(ys) + 2, min(xs) - 1, max(xs) + 2)
+
+    def _recount_window(self, y0, y1, x0, x1):
+        y0, y1 = max(y0, 0), min(y1, self.height)
+        x0, x1 = max(x0, 0), min(x1, self.width)
+        tracing.count("recount_cells", (y1 - y0) * (x1 - x0))
+        # one extra ring of mines so the box edges see their outside neighbors
+        wy0, wy1 = max(y0 - 1, 0), min(y1 + 1, self.height)
+        wx0, wx1 = max(x0 - 1, 0), min(x1 + 1, self.width)
+        counts = neighbor_counts(self.mines[wy0:wy1, wx0:wx1])
+        self.counts[y0:y1, x0:x1] = counts[y0 - wy0:y1 - wy0, x0 - wx0:x1 - wx0]
+
+
+class _GridView:
+    # Nested-list style access to an ArrayGameBoard: grid[y][x] is "M" or an int
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.height
+
+    def __getitem__(self, y):
+        return _RowView(self.board, y)
+
+    def __setitem__(self, y, row):
+        row_view = _RowView(self.board, y)
+        for x, cell in enumerate(row):
+            row_view[x] = cell
+
+    def __iter__(self):
+        for y in range(self.board.height):
+            yield _RowView(self.board, y)
+
+
+class _RowView:
+    def __init__(self, board, y):
+        self.mines = board.mines[y]
+        self.counts = board.counts[y]
+
+    def __len__(self):
+        return len(self.mines)
+
+    def __getitem__(self, x):
+        if self.mines[x]:
+            return "M"
+        return int(self.counts[x])
+
+    def __setitem__(self, x, cell):
+        if cell == "M":
+            self.mines[x] = True
+            self.counts[x] = 0
+        else:
+            self.mines[x] = False
+            self.counts[x] = int(cell)
+
+    def __iter__(self):
+        for x in range(len(self.mines)):
+            yield self[x]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class RowSupply:
+    # The endless rows above the board that gravity and encroach pull in,
+    # numbered from 0 in the order they arrive. Row k is made by its own
+    # RNG, seeded with (seed, k), so the supply is the same whatever
+    # happened on the board, nothing has to be stored to reproduce it, and
+    # each row costs the same however long the game runs.
+    def __init__(self, width, mines_per_row, seed, pulled=0):
+        self.width = width
+        self.mines_per_row = mines_per_row
+        self.seed = seed
+        self.pulled = pulled  # number of the next row to hand out
+
+    def make_row(self, k):
+        rng = random.Random(f"{self.seed}:{k}")
+        row = [0] * self.width
+        n = self.mines_per_row
+        n_mines = rng.randint(max(0, n - 2), min(self.width, n + 2))
+        for x in rng.sample(range(self.width), n_mines):
+            row[x] = "M"
+        return row
+
+    def pull(self):
+        row = self.make_row(self.pulled)
+        self.pulled += 1
+        return row
+
+
+class ChunkIndex:
+    # Chunk labels for gravity, kept up to date as the board changes instead
+    # of relabelling the whole board on every identify_chunks().
+    # Hidden, unflagged cells are grouped into 4-connected chunks, every
+    # flagged cell is a chunk of its own, and revealed cells have label 0.
+    # Nothing is labelled until the index is first asked for.
+    def __init__(self, board):
+        self.board = board
+        self.label = None  # label[y][x]
+        self.cells = {}  # label -> set of (x, y)
+        self.next_label = 1
+
+    def reset(self):
+        self.label = None
+        self.cells = {}
+
+    def build(self):
+        board = self.board
+        self.label = [[0] * board.width for _ in range(board.height)]
+        self.cells = {}
+        for y in range(board.height):
+            for x in range(board.width):
+                if board.revealed[y][x] or self.label[y][x]:
+                    continue
+                if board.flagged[y][x]:
+                    self._new_chunk({(x, y)})
+                    continue
+                chunk = {(x, y)}
+                stack = [(x, y)]
+                while stack:
+                    cx, cy = stack.pop()
+                    for dx, dy, d in board.neighbors4[cy * board.width + cx]:
+                        nx, ny = cx + dx, cy + dy
+                        if (nx, ny) not in chunk and self._joinable(nx, ny):
+                            chunk.add((nx, ny))
+                            stack.append((nx, ny))
+                self._new_chunk(chunk)
+
+    def labels(self):
+        if self.label is None:
+            self.build()
+        return self.label
+
+    def chunk_at(self, x, y):
+        # label of the chunk holding (x, y), 0 if it is revealed
+        return self.labels()[y][x]
+
+    def top_labels(self):
+        # the unflagged chunks touching row 0, which gravity moves as one
+        top_row = self.labels()[0]
+        return {lab for x, lab in enumerate(top_row) if lab and not self.board.flagged[0][x]}
+
+    def _joinable(self, x, y):
+        return not self.board.revealed[y][x] and not self.board.flagged[y][x]
+
+    def _new_chunk(self, cells):
+        lab = self.next_label
+        self.next_label += 1
+        self.cells[lab] = cells
+        for x, y in cells:
+            self.label[y][x] = lab
+        return lab
+
+    def _union(self, a, b):
+        if len(self.cells[a]) < len(self.cells[b]):
+            a, b = b, a
+        for x, y in self.cells[b]:
+            self.label[y][x] = a
+        self.cells[a].update(self.cells.pop(b))
+        return a
+
+    def _merge_around(self, cells):
+        # join each cell's chunk with the unflagged chunks next to it
+        for x, y in cells:
+            lab = self.label[y][x]
+            if not lab or self.board.flagged[y][x]:
+                continue
+            for dx, dy, d in self.board.neighbors4[y * self.board.width + x]:
+                nx, ny = x + dx, y + dy
+                other = self.label[ny][nx]
+                if other and other != lab and not self.board.flagged[ny][nx]:
+                    lab = self._union(lab, other)
+
+    def reveal(self, cells):
+        # cells were revealed: drop them, then split chunks that came apart
+        if self.label is None:
+            return
+        removed = {}
+        for x, y in cells:
+            lab = self.label[y][x]
+            if not lab:
+                continue
+            self.label[y][x] = 0
+            self.cells[lab].discard((x, y))
+            removed.setdefault(lab, []).append((x, y))
+        for lab, lost in removed.items():
+            if not self.cells[lab]:
+                del self.cells[lab]
+                continue
+            seeds = set()
+            for x, y in lost:
+                for dx, dy, d in self.board.neighbors4[y * self.board.width + x]:
+                    if self.label[y + dy][x + dx] == lab:
+                        seeds.add((x + dx, y + dy))
+            self._split(lab, seeds)
+
+    def hide(self, cells):
+        # cells became hidden and unflagged (encroached rows)
+        if self.label is None:
+            return
+        self.reveal(cells)
+        self._new_chunk(set(cells))
+        self._merge_around(cells)
+
+    def flag(self, x, y):
+        # (x, y) was flagged or unflagged
+        if self.label is None:
+            return
+        self.reveal([(x, y)])
+        self._new_chunk({(x, y)})
+        self._merge_around([(x, y)])
+
+    def move(self, moves):
+        # whole chunks fell: moves holds (x, y, drop) for every moving cell
+        if self.label is None:
+            return
+        moved = {}
+        for x, y, drop in moves:
+            moved.setdefault(self.label[y][x], []).append((x, y + drop))
+            self.label[y][x] = 0
+        for lab, cells in moved.items():
+            self.cells[lab] = set(cells)
+            for x, y in cells:
+                self.label[y][x] = lab
+        for cells in moved.values():
+            self._merge_around(cells)
+
+    def _split(self, lab, seeds):
+        # Grow one search from each seed in turn. Searches that meet are
+        # merged, and a search that runs out of cells has found a separate
+        # piece, which gets a new label. Stop as soon as one search is left,
+        # so the biggest piece is never walked in full.
+        if len(seeds) < 2:
+            return
+        owner = {}
+        parent = {}
+        queues = {}
+        found = {}
+        for sid, seed in enumerate(seeds):
+            owner[seed] = parent[sid] = sid
+            queues[sid] = collections.deque([seed])
+            found[sid] = [seed]
+
+        def find(sid):
+            while parent[sid] != sid:
+                parent[sid] = parent[parent[sid]]
+                sid = parent[sid]
+            return sid
+
+        while len(queues) > 1:
+            for sid in list(queues):
+                if sid not in queues or len(queues) == 1:
+                    continue  # merged away this round
+                if not queues[sid]:
+                    del queues[sid]
+                    piece = set(found.pop(sid))
+                    self.cells[lab] -= piece
+                    self._new_chunk(piece)
+                    continue
+                x, y = queues[sid].popleft()
+                for dx, dy, d in self.board.neighbors4[y * self.board.width + x]:
+                    nx, ny = x + dx, y + dy
+                    if self.label[ny][nx] != lab:
+                        continue
+                    other = owner.get((nx, ny))
+                    if other is None:
+                        owner[(nx, ny)] = sid
+                        queues[sid].append((nx, ny))
+                        found[sid].append((nx, ny))
+                        continue
+                    other = find(other)
+                    if other != sid:
+                        if len(found[other]) > len(found[sid]):
+                            sid, other = other, sid
+                        parent[other] = sid
+                        queues[sid].extend(queues.pop(other))
+                        found[sid].extend(found.pop(other))
+
+
+# class Chunk:
+#     def __init__(self, shape, x, y):
+#         self.shape = shape  # 2D list, 1 = block, 0 = empty
+
+    # def cells(self):
+    #     """Yield absolute positions of occupied cells"""
+    #     for dy, row in enumerate(self.shape):
+    #         for dx, val in enumerate(row):
+    #             if val:
+    #                 yield (self.x + dx, self.y + dy)
@@ -0,0 +1,40 @@
+import collections
+import concurrent.futures
+import random
+
+# ------------------------
+# Board pre-generation
+# ------------------------
+# Keeps a few seeded boards ready for RESTART, made (mines placed and
+# counted) on a background thread while the current game is played:
+#
+#     pool = BoardPool(GameBoard, 10, 15, 20)
+#     seed, board = pool.take()  # instant once the pool has caught up
+#
+# Each board comes with the seed it was made from, so a GameLog can still
+# record the restart.
+
+
+class BoardPool:
+    def __init__(self, board_class, width, height, mines, size=2, seed=None):
+        self.board_class = board_class
+        self.width = width
+        self.height = height
+        self.mines = mines
+        self.seeds = random.Random(seed)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="BoardPool")
+        self.ready = collections.deque(self._order() for _ in range(size))  # (seed, future)
+
+    def _order(self):
+        seed = self.seeds.randrange(2 ** 32)
+        return seed, self.executor.submit(self.board_class, self.width, self.height, self.mines, seed=seed)
+
+    def take(self):
+        # The oldest board, waiting for it if it isn't made yet; a new one
+        # is ordered in its place
+        seed, future = self.ready.popleft()
+        self.ready.append(self._order())
+        return seed, future.result()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
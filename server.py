@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import json
+
+from board import GameBoard
+
+# ------------------------
+# Game server
+# ------------------------
+# Many games from one process: every TCP connection is a session with its
+# own board, spoken to in JSON lines. Requests:
+#
+#     {"action": "new", "width": 10, "height": 15, "mines": 20, "seed": 1}
+#     {"action": "reveal", "x": 3, "y": 4}
+#     {"action": "space_bar", "x": 3, "y": 4}
+#     {"action": "gravity"}
+#     {"action": "blast"}
+#
+# Each reply carries only the cells that changed, as [x, y, look] with look
+# "hidden", "flagged", "M" or the number shown:
+#
+#     {"ok": true, "score": 0, "game_over": false, "cells": [[3, 4, 1], ...]}
+#     {"ok": false, "error": "..."}
+#
+# A session starts with a 10x15 board (all hidden) until it asks for "new".
+# Anything done to a big board (making it, clicks, gravity, blast, and
+# encoding a reply with many cells) goes to a thread pool, so one session's
+# flood fill or settling doesn't hold up everyone else's clicks.
+#
+#     python server.py --port 8765
+
+DEFAULT_BOARD = {"width": 10, "height": 15, "mines": 20}
+MAX_CELLS = 1_000_000  # largest board a session may ask for
+OFFLOAD_CELLS = 10_000  # boards (and replies) at least this big are worked on in the pool
+MAX_LINE = 4096  # bytes per request
+
+
+def encode(reply):
+    return json.dumps(reply, separators=(",", ":")).encode() + b"\n"
+
+
+class Session:
+    __slots__ = ("board", "changed")
+
+    def __init__(self, width, height, mines, seed=None):
+        if width < 1 or height < 1 or width * height > MAX_CELLS:
+            raise ValueError(f"Board must have between 1 and {MAX_CELLS} cells")
+        self.board = GameBoard(width, height, mines, seed=seed)
+        self.changed = self.board.watch()
+
+    def look(self, x, y):
+        if self.board.revealed[y][x]:
+            return self.board.grid[y][x]
+        if self.board.flagged[y][x]:
+            return "flagged"
+        return "hidden"
+
+    def delta(self):
+        cells = [[x, y, self.look(x, y)] for x, y in self.changed]
+        self.changed.clear()
+        return cells
+
+    def cell(self, request):
+        x, y = request.get("x"), request.get("y")
+        if not (isinstance(x, int) and isinstance(y, int)
+                and 0 <= x < self.board.width and 0 <= y < self.board.height):
+            raise ValueError("x and y must be on the board")
+        return x, y
+
+
+class GameServer:
+    def __init__(self, executor=None):
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor()
+        self.sessions = set()
+
+    async def run(self, cells, work):
+        # work() on the pool if it concerns at least OFFLOAD_CELLS cells, so
+        # the other sessions aren't held up, inline otherwise
+        if cells >= OFFLOAD_CELLS:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, work)
+        return work()
+
+    async def handle(self, request, session):
+        # Returns (session, reply); "new" swaps the session for a fresh one
+        action = request.get("action")
+        board = session.board
+        if action == "new":
+            options = {**DEFAULT_BOARD, **request}
+            width, height = options["width"], options["height"]
+            if not (isinstance(width, int) and isinstance(height, int)):
+                raise ValueError("width and height must be integers")
+            session = await self.run(width * height, functools.partial(
+                Session, width, height, options["mines"], options.get("seed")))
+            return session, {"ok": True, "width": width, "height": height,
+                             "score": 0, "game_over": False, "cells": []}
+        if action in ("reveal", "space_bar"):
+            x, y = session.cell(request)
+            work = functools.partial(board.reveal_tile if action == "reveal" else board.space_bar_tile, x, y)
+        elif action in ("gravity", "blast"):
+            work = board.enact_gravity if action == "gravity" else board.blast
+        else:
+            raise ValueError(f"Unknown action: {action}")
+
+        def play():
+            # the action and the delta it leaves (which can be as big as the board)
+            if not board.game_over:
+                work()
+            return {"ok": True, "score": board.get_score(), "game_over": board.game_over,
+                    "cells": session.delta()}
+        return session, await self.run(board.width * board.height, play)
+
+    async def serve_client(self, reader, writer):
+        session = Session(**DEFAULT_BOARD)
+        self.sessions.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    break  # request longer than MAX_LINE
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object")
+                    session, reply = await self.handle(request, session)
+                except (ValueError, TypeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                line = await self.run(len(reply.get("cells", ())), functools.partial(encode, reply))
+                writer.write(line)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(writer)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.serve_client, host, port, limit=MAX_LINE)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Minesweeper games over TCP (JSON lines).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="threads for work on big boards")
+    args = parser.parse_args()
+    server = GameServer(concurrent.futures.ThreadPoolExecutor(max_workers=args.workers))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import statistics
+import time
+
+from board import GameBoard, ArrayGameBoard
+
+# ------------------------
+# Headless game driver
+# ------------------------
+# Plays seeded games straight on GameBoard, no pygame involved, and spreads
+# them over a process pool. Used to tune N_MINES and the blast / encroach
+# scoring at scale:
+#
+#     python simulate.py --games 5000 --policy gravity --width 10 --height 15 --mines 20
+#
+# A policy looks at the board and returns the next action, or None to stop:
+#     ("reveal", x, y), ("space", x, y), ("gravity",), ("blast",)
+
+
+def hidden_cells(board):
+    return [(x, y) for y in range(board.height) for x in range(board.width)
+            if not board.revealed[y][x] and not board.flagged[y][x]]
+
+
+def random_policy(board, rng):
+    cells = hidden_cells(board)
+    if not cells:
+        return None
+    x, y = rng.choice(cells)
+    return ("reveal", x, y)
+
+
+def certain_move(board):
+    # a flag on a cell that must be a mine, or a chord on a number whose
+    # mines are all flagged; None if there is nothing certain to do
+    for y in range(board.height):
+        for x in range(board.width):
+            if not board.revealed[y][x] or board.grid[y][x] in (0, "M"):
+                continue
+            hidden = []
+            flagged = 0
+            for dx, dy, d in board.neighbors8[y * board.width + x]:
+                nx, ny = x + dx, y + dy
+                if board.flagged[ny][nx]:
+                    flagged += 1
+                elif not board.revealed[ny][nx]:
+                    hidden.append((nx, ny))
+            if not hidden:
+                continue
+            if flagged == board.grid[y][x]:
+                return ("space", x, y)
+            if flagged + len(hidden) == board.grid[y][x]:
+                nx, ny = hidden[0]
+                return ("space", nx, ny)
+    return None
+
+
+def solver_policy(board, rng):
+    return certain_move(board) or random_policy(board, rng)
+
+
+def gravity_policy(board, rng):
+    # play like the solver, cash in full lines as soon as they appear, and
+    # let things fall (flags pile up at the bottom) before guessing
+    if board.full_rows or board.full_cols:
+        return ("blast",)
+    action = certain_move(board)
+    if action is not None:
+        return action
+    groups, drops = board.settle_drops()
+    if any(drops):
+        return ("gravity",)
+    return random_policy(board, rng)
+
+
+POLICIES = {
+    "random": random_policy,
+    "solver": solver_policy,
+    "gravity": gravity_policy,
+}
+
+
+def is_cleared(board):
+    return all(board.revealed[y][x] or board.grid[y][x] == "M"
+               for y in range(board.height) for x in range(board.width))
+
+
+def play_game(seed, policy="random", width=10, height=15, mines=20, max_moves=1000, array=False):
+    board_class = ArrayGameBoard if array else GameBoard
+    board = board_class(width, height, mines, seed=seed)
+    rng = random.Random(seed)
+    choose = POLICIES[policy]
+    timings = collections.defaultdict(list)
+    moves = 0
+    while moves < max_moves and not board.game_over:
+        action = choose(board, rng)
+        if action is None:
+            break
+        name, args = action[0], action[1:]
+        start = time.perf_counter()
+        if name == "reveal":
+            board.reveal_tile(*args)
+        elif name == "space":
+            board.space_bar_tile(*args)
+        elif name == "gravity":
+            board.enact_gravity()
+        elif name == "blast":
+            board.blast()
+        timings[name].append(time.perf_counter() - start)
+        moves += 1
+    return {
+        "seed": seed,
+        "won": not board.game_over and is_cleared(board),
+        "score": board.get_score(),
+        "moves": moves,
+        "timings": dict(timings),
+    }
+
+
+def _play_batch(seeds, options):
+    return [play_game(seed, **options) for seed in seeds]
+
+
+def run_games(n_games, seed=0, workers=None, batch_size=50, **options):
+    # Games are sent to the workers in batches so process overhead doesn't
+    # swamp small boards; each game is still seeded on its own
+    seeds = list(range(seed, seed + n_games))
+    batches = [seeds[i:i + batch_size] for i in range(0, n_games, batch_size)]
+    results = []
+    if workers == 1:
+        for batch in batches:
+            results.extend(_play_batch(batch, options))
+        return results
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch_results in pool.map(_play_batch, batches, [options] * len(batches)):
+            results.extend(batch_results)
+    return results
+
+
+def summarize(results):
+    scores = sorted(r["score"] for r in results)
+    timings = collections.defaultdict(list)
+    for r in results:
+        for name, samples in r["timings"].items():
+            timings[name].extend(samples)
+
+    def percentile(values, q):
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+    operations = {}
+    for name, samples in sorted(timings.items()):
+        samples.sort()
+        operations[name] = {
+            "count": len(samples),
+            "mean_ms": 1000 * statistics.fmean(samples),
+            "p95_ms": 1000 * percentile(samples, 0.95),
+            "max_ms": 1000 * samples[-1],
+        }
+    return {
+        "games": len(results),
+        "win_rate": sum(r["won"] for r in results) / len(results),
+        "score": {
+            "mean": statistics.fmean(scores),
+            "median": statistics.median(scores),
+            "p10": percentile(scores, 0.10),
+            "p90": percentile(scores, 0.90),
+            "max": scores[-1],
+        },
+        "moves_mean": statistics.fmean(r["moves"] for r in results),
+        "operations": operations,
+    }
+
+
+def print_summary(summary, elapsed):
+    print(f"{summary['games']} games in {elapsed:.2f}s ({summary['games'] / elapsed:.0f} games/s)")
+    print(f"win rate: {summary['win_rate']:.1%}, moves/game: {summary['moves_mean']:.1f}")
+    score = summary["score"]
+    print(f"score: mean {score['mean']:.1f}, median {score['median']}, "
+          f"p10 {score['p10']}, p90 {score['p90']}, max {score['max']}")
+    for name, op in summary["operations"].items():
+        print(f"  {name:8} x{op['count']:<8} mean {op['mean_ms']:.3f}ms  "
+              f"p95 {op['p95_ms']:.3f}ms  max {op['max_ms']:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play seeded Minesweeper games headless.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="solver")
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--height", type=int, default=15)
+    parser.add_argument("--mines", type=int, default=20)
+    parser.add_argument("--max-moves", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--array", action="store_true", help="use the numpy-backed board")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_games(args.games, seed=args.seed, workers=args.workers, batch_size=args.batch_size,
+                        policy=args.policy, width=args.width, height=args.height,
+                        mines=args.mines, max_moves=args.max_moves, array=args.array)
+    summary = summarize(results)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import base64
+import json
+import random
+import struct
+import time
+
+try:
+    import numpy as np
+except ImportError:  # only makes packing faster
+    np = None
+
+import tracing
+from board import GameBoard, ArrayGameBoard, RowSupply
+
+# ------------------------
+# Snapshots / replay log
+# ------------------------
+# A snapshot is the whole game state in a few bytes per 8 cells:
+#
+#     header   magic, version, width, height, initial_mines, score,
+#              first_click, game_over, whether it is an ArrayGameBoard
+#     rng      the board's random.Random state (625 words + gauss_next)
+#     rows     how many rows the endless supply has handed out, and its seed
+#     mines, revealed, flagged
+#              one bit per cell each, row by row, packed 8 to a byte
+#
+# Numbers are not stored, they are recounted from the mines on load. A
+# 1000x1000 board comes to about 375KB.
+#
+# GameLog records every action applied to a board, and a snapshot every
+# snapshot_every actions, so any point of a game can be rebuilt by loading
+# the nearest snapshot before it and replaying the rest:
+#
+#     log = GameLog("game.log")
+#     board = log.restart(GameBoard, 10, 15, 20)
+#     log.play(board, "reveal", 3, 4)
+#     ...
+#     board = replay(read_log("game.log"), moves=120)
+#
+# NullLog has the same methods and records nothing, for games nobody will
+# replay.
+#
+# The log is JSON lines, one entry per line:
+#     ["restart", {"width": ..., "height": ..., "mines": ..., "seed": ..., "array": ...}]
+#     ["reveal", x, y], ["space_bar", x, y], ["gravity"], ["blast"]
+#     ["snapshot", "<base64 snapshot>"]
+
+MAGIC = b"MSNP"
+VERSION = 2
+HEADER = struct.Struct("<4sHIIIq???")
+RNG_STATE = struct.Struct("<625I?d")
+ROWS = struct.Struct("<QH")  # rows pulled, length of the seed text that follows
+SNAPSHOT_EVERY = 100  # actions between snapshots in a GameLog
+
+
+def pack_bits(layer, n_cells):
+    # layer: nested rows of bools (lists or a numpy array)
+    if np is not None:
+        return np.packbits(np.asarray(layer, dtype=bool)).tobytes()
+    bits = "".join("1" if cell else "0" for row in layer for cell in row)
+    bits += "0" * (-n_cells % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big") if bits else b""
+
+
+def unpack_bits(data, width, height):
+    # Returns a flat sequence of width * height bools
+    n_cells = width * height
+    if np is not None:
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=n_cells).astype(bool)
+    bits = format(int.from_bytes(data, "big"), f"0{len(data) * 8}b")[:n_cells]
+    return [bit == "1" for bit in bits]
+
+
+def snapshot(board: GameBoard) -> bytes:
+    width, height = board.width, board.height
+    n_cells = width * height
+    array = isinstance(board, ArrayGameBoard)
+    if array:
+        mines = board.mines
+    else:
+        mines = [[cell == "M" for cell in row] for row in board.grid]
+    version, words, gauss_next = board.rng.getstate()
+    row_seed = str(board.rows.seed).encode()
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, width, height, board.initial_mines, board.score,
+                    board.first_click, board.game_over, array),
+        RNG_STATE.pack(*words, gauss_next is not None, gauss_next or 0.0),
+        ROWS.pack(board.rows.pulled, len(row_seed)),
+        row_seed,
+        pack_bits(mines, n_cells),
+        pack_bits(board.revealed, n_cells),
+        pack_bits(board.flagged, n_cells),
+    ])
+
+
+def restore(data: bytes, board_class=None) -> GameBoard:
+    # Rebuilds the board saved by snapshot(); board_class defaults to the
+    # class it was saved from
+    magic, version, width, height, initial_mines, score, first_click, game_over, array = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a board snapshot (or from an unknown version)")
+    *words, has_gauss, gauss_next = RNG_STATE.unpack_from(data, HEADER.size)
+    if board_class is None:
+        board_class = ArrayGameBoard if array else GameBoard
+    offset = HEADER.size + RNG_STATE.size
+    pulled, seed_length = ROWS.unpack_from(data, offset)
+    offset += ROWS.size
+    row_seed = data[offset:offset + seed_length].decode()
+    offset += seed_length
+    layer_size = (width * height + 7) // 8
+    layers = []
+    for i in range(3):
+        layers.append(unpack_bits(data[offset + i * layer_size:offset + (i + 1) * layer_size], width, height))
+    mines, revealed, flagged = layers
+
+    array = issubclass(board_class, ArrayGameBoard)
+    if np is not None:
+        positions = np.flatnonzero(mines)
+        if not array:
+            positions = positions.tolist()
+    else:
+        positions = [i for i, mine in enumerate(mines) if mine]
+    board = board_class(width, height, initial_mines, mines=positions)
+    if array:
+        board.revealed = np.asarray(revealed).reshape(height, width)
+        board.flagged = np.asarray(flagged).reshape(height, width)
+    else:
+        revealed, flagged = list(map(bool, revealed)), list(map(bool, flagged))
+        board.revealed = [revealed[y * width:(y + 1) * width] for y in range(height)]
+        board.flagged = [flagged[y * width:(y + 1) * width] for y in range(height)]
+    board._count_flags()
+    board.rng.setstate((3, tuple(words), gauss_next if has_gauss else None))
+    board.rows = RowSupply(width, initial_mines // height, row_seed, pulled)
+    board.score = score
+    board.first_click = first_click
+    board.game_over = game_over
+    return board
+
+
+def apply(board, action, *args):
+    if action == "reveal":
+        return board.reveal_tile(*args)
+    if action == "space_bar":
+        return board.space_bar_tile(*args)
+    if action == "gravity":
+        return board.enact_gravity()
+    if action == "blast":
+        return board.blast()
+    raise ValueError(f"Unknown action: {action}")
+
+
+class GameLog:
+    # Append-only record of a game. With a path, entries are appended to
+    # that file as they happen; without one they are kept in self.entries.
+    def __init__(self, path=None, snapshot_every=SNAPSHOT_EVERY):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.entries = []
+        self.since_snapshot = 0
+
+    def _append(self, entry):
+        if self.path is None:
+            self.entries.append(entry)
+            return
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def restart(self, board_class, width, height, mines, seed=None, board=None):
+        # A new board; the seed is logged, so it is picked here if not given.
+        # board: one already made from that seed (say by a BoardPool)
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        if board is None:
+            board = board_class(width, height, mines, seed=seed)  # may raise; nothing is logged then
+        self._append(["restart", {"width": width, "height": height, "mines": mines, "seed": seed,
+                                  "array": issubclass(board_class, ArrayGameBoard)}])
+        self.since_snapshot = 0
+        return board
+
+    def play(self, board, action, *args):
+        result = apply(board, action, *args)
+        self._played(board, action, *args)
+        return result
+
+    def play_steps(self, board, action, **options):
+        # gravity or blast as a generator doing the work a step at a time
+        # (see GameBoard.gravity_steps); logged once it has run to the end,
+        # and traced as one span under the action's name, from now until then
+        if action == "gravity":
+            steps = board.gravity_steps(**options)
+        elif action == "blast":
+            steps = board.blast_steps(**options)
+        else:
+            raise ValueError(f"No steps for action: {action}")
+        return self._play_steps(board, action, steps, time.perf_counter())
+
+    def _play_steps(self, board, action, steps, start):
+        yield from steps
+        tracing.record(action, time.perf_counter() - start)
+        self._played(board, action)
+
+    def _played(self, board, action, *args):
+        self._append([action, *args])
+        self.since_snapshot += 1
+        if self.since_snapshot >= self.snapshot_every:
+            self.snapshot(board)
+
+    def snapshot(self, board):
+        self._append(["snapshot", base64.b64encode(snapshot(board)).decode("ascii")])
+        self.since_snapshot = 0
+
+
+class NullLog(GameLog):
+    # plays actions like a GameLog (play_steps is still traced) but keeps
+    # no entries and takes no snapshots
+    def _append(self, entry):
+        pass
+
+    def snapshot(self, board):
+        self.since_snapshot = 0
+
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(entries, moves=None):
+    # The board after the first `moves` actions of the log (all of them if
+    # None), starting from the last restart or snapshot at or before that
+    # point. Restarts count as actions, snapshots don't.
+    if moves is None:
+        moves = sum(entry[0] != "snapshot" for entry in entries)
+    start, done, actions = None, 0, 0
+    for i, entry in enumerate(entries):
+        if entry[0] != "snapshot":
+            actions += 1
+        if actions > moves:
+            break
+        if entry[0] in ("restart", "snapshot"):
+            start, done = i, actions
+    if start is None:
+        raise ValueError("The log has no restart to start from")
+
+    kind, data = entries[start]
+    if kind == "restart":
+        board_class = ArrayGameBoard if data["array"] else GameBoard
+        board = board_class(data["width"], data["height"], data["mines"], seed=data["seed"])
+    else:
+        board = restore(base64.b64decode(data))
+    for entry in entries[start + 1:]:
+        if done == moves:
+            break
+        if entry[0] != "snapshot":
+            apply(board, *entry)
+            done += 1
+    return board
@@ -0,0 +1,224 @@
+from board import GameBoard
+
+# ------------------------
+# Constraint solver / hints
+# ------------------------
+# Works out which hidden cells are provably safe or provably mines, from the
+# revealed numbers and the flags (flags are trusted as mines):
+#
+#     solver = Solver(board)
+#     solver.hint()        # ("reveal", (x, y)), ("flag", (x, y)) or None
+#
+# Every revealed number with hidden neighbors is a constraint "these cells
+# hold this many mines". The solver follows the board through board.watch()
+# and, on each query, only rebuilds the constraints around cells that
+# changed and re-solves the frontier components they belong to. Single-cell
+# and subset rules go first; small components that are still undecided are
+# enumerated exhaustively.
+
+ENUMERATION_LIMIT = 16  # largest number of undecided cells enumerated exhaustively
+
+
+class Solver:
+    def __init__(self, board: GameBoard):
+        self.board = board
+        self.changed = board.watch()
+        self.constraints = {}  # number cell -> (frozenset of unknown neighbors, mines left)
+        self.by_unknown = {}  # unknown cell -> set of number cells constraining it
+        self.safe = set()
+        self.mines = set()
+        # only revealed cells can carry a constraint
+        self.changed.update((x, y) for y, row in enumerate(board.revealed) for x, r in enumerate(row) if r)
+
+    def _constraint(self, x, y):
+        board = self.board
+        if not board.revealed[y][x] or board.grid[y][x] in (0, "M"):
+            return None
+        unknowns = []
+        count = board.grid[y][x]
+        for dx, dy, d in board.neighbors8[y * board.width + x]:
+            nx, ny = x + dx, y + dy
+            if board.flagged[ny][nx]:
+                count -= 1
+            elif not board.revealed[ny][nx]:
+                unknowns.append((nx, ny))
+        if not unknowns:
+            return None
+        return frozenset(unknowns), count
+
+    def _set_constraint(self, cell, constraint):
+        old = self.constraints.pop(cell, None)
+        if old is not None:
+            for u in old[0]:
+                self.by_unknown[u].discard(cell)
+                if not self.by_unknown[u]:
+                    del self.by_unknown[u]
+        if constraint is not None:
+            self.constraints[cell] = constraint
+            for u in constraint[0]:
+                self.by_unknown.setdefault(u, set()).add(cell)
+
+    def update(self):
+        # catch up with the cells the board changed since the last query
+        if not self.changed:
+            return
+        changed = list(self.changed)
+        self.changed.clear()
+        touched = set()
+        width, neighbors = self.board.width, self.board.neighbors8
+        for x, y in changed:
+            touched.add((x, y))
+            touched.update((x + dx, y + dy) for dx, dy, d in neighbors[y * width + x])
+        seeds = set()
+        stale = set(changed)
+        for cell in touched:
+            constraint = self._constraint(*cell)
+            if self.constraints.get(cell) != constraint:
+                if cell in self.constraints:
+                    # the old cells lose a constraint, and their component
+                    # may come apart
+                    old_cells = self.constraints[cell][0]
+                    stale.update(old_cells)
+                    seeds.update(c for u in old_cells for c in self.by_unknown[u])
+                self._set_constraint(cell, constraint)
+                seeds.add(cell)
+        self.safe -= stale
+        self.mines -= stale
+        # whatever was known about those cells is worked out again
+        seeds.update(c for u in stale for c in self.by_unknown.get(u, ()))
+        self._solve(seeds)
+
+    def _component(self, seeds):
+        component = set()
+        stack = [c for c in seeds if c in self.constraints]
+        while stack:
+            cell = stack.pop()
+            if cell in component:
+                continue
+            component.add(cell)
+            for u in self.constraints[cell][0]:
+                stack.extend(self.by_unknown[u])
+        return component
+
+    def _solve(self, seeds):
+        component = self._component(seeds)
+        # forget what was deduced around the change; it is rebuilt below
+        stale = {u for cell in component for u in self.constraints[cell][0]}
+        self.safe -= stale
+        self.mines -= stale
+
+        work = {cell: [set(self.constraints[cell][0]), self.constraints[cell][1]] for cell in component}
+        known = {}
+
+        def decide(u, mine):
+            if u in known:
+                return known[u] == mine
+            known[u] = mine
+            for cell in self.by_unknown[u]:
+                work[cell][0].discard(u)
+                work[cell][1] -= mine
+                queue.append(cell)
+            return True
+
+        queue = list(component)
+        while queue:
+            cell = queue.pop()
+            cells, count = work[cell]
+            if count < 0 or count > len(cells):
+                return  # contradicts the flags; nothing can be trusted here
+            if not cells:
+                continue
+            if count == 0 or count == len(cells):
+                for u in list(cells):
+                    decide(u, int(count > 0))
+                continue
+            # subset rule: if these cells are all inside another constraint,
+            # the rest of that one holds the difference
+            for u in cells:
+                for other in self.by_unknown[u]:
+                    other_cells, other_count = work[other]
+                    if other == cell or not cells < other_cells:
+                        continue
+                    rest = other_cells - cells
+                    if other_count - count == 0:
+                        for v in rest:
+                            decide(v, 0)
+                    elif other_count - count == len(rest):
+                        for v in rest:
+                            decide(v, 1)
+
+        for u, mine in known.items():
+            (self.mines if mine else self.safe).add(u)
+
+        # what is left undecided splits into independent pieces; small ones
+        # are settled by trying every assignment
+        left = {cell: (frozenset(cells), count) for cell, (cells, count) in work.items() if cells}
+        while left:
+            cell, (cells, count) = left.popitem()
+            piece = [(cells, count)]
+            unknowns = set(cells)
+            stack = list(cells)
+            while stack:
+                u = stack.pop()
+                for other in self.by_unknown[u]:
+                    if other in left:
+                        other_cells, other_count = left.pop(other)
+                        piece.append((other_cells, other_count))
+                        stack.extend(other_cells - unknowns)
+                        unknowns |= other_cells
+            if len(unknowns) <= ENUMERATION_LIMIT:
+                self._enumerate(piece, sorted(unknowns))
+
+    def _enumerate(self, piece, unknowns):
+        # backtracking over the cells of one piece; a cell that is the same in
+        # every consistent assignment is decided
+        position = {u: i for i, u in enumerate(unknowns)}
+        needs = [count for cells, count in piece]
+        open_cells = [len(cells) for cells, count in piece]
+        touching = [[] for _ in unknowns]
+        for k, (cells, count) in enumerate(piece):
+            for u in cells:
+                touching[position[u]].append(k)
+        assignment = [0] * len(unknowns)
+        seen = [set() for _ in unknowns]
+
+        def assign(i):
+            if i == len(unknowns):
+                for j, value in enumerate(assignment):
+                    seen[j].add(value)
+                return
+            for value in (0, 1):
+                if all(0 <= needs[k] - value <= open_cells[k] - 1 for k in touching[i]):
+                    for k in touching[i]:
+                        needs[k] -= value
+                        open_cells[k] -= 1
+                    assignment[i] = value
+                    assign(i + 1)
+                    for k in touching[i]:
+                        needs[k] += value
+                        open_cells[k] += 1
+
+        assign(0)
+        for u, values in zip(unknowns, seen):
+            if values == {0}:
+                self.safe.add(u)
+            elif values == {1}:
+                self.mines.add(u)
+
+    def safe_cells(self):
+        self.update()
+        return set(self.safe)
+
+    def mine_cells(self):
+        self.update()
+        return set(self.mines)
+
+    def hint(self):
+        # a cell that is certainly safe to reveal, else one that certainly
+        # needs a flag, else None
+        self.update()
+        if self.safe:
+            return ("reveal", min(self.safe))
+        if self.mines:
+            return ("flag", min(self.mines))
+        return None
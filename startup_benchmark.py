@@ -0,0 +1,126 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# ------------------------
+# Startup benchmark
+# ------------------------
+# How long the game takes to show its first frame, and how long RESTART
+# and the first click take, with the board pool against building boards on
+# the spot:
+#
+#     python startup_benchmark.py --headless
+#     python startup_benchmark.py --headless --size 1000x1000 --mines 150000 --array
+#
+# Time to first frame is measured in a fresh interpreter each run, from
+# before `import main` to the first display update. --headless uses SDL's
+# dummy video driver, for machines without a display.
+
+FIRST_FRAME = """
+import time
+start = time.perf_counter()
+import main
+main.N_TILES_X, main.N_TILES_Y, main.N_MINES = {width}, {height}, {mines}
+main.TILE_SIZE = {tile_size}
+main.GRID_HEIGHT = main.N_TILES_Y * main.TILE_SIZE
+main.USE_ARRAY_BOARD = {array}
+main.main(frames=1)
+print(time.perf_counter() - start)
+"""
+MAX_WINDOW = 2000  # pixels; tiles are shrunk to keep big boards on a window this size
+
+
+def tile_size(width, height):
+    return max(1, min(30, MAX_WINDOW // max(width, height)))
+
+
+def time_to_first_frame(width, height, mines, array, runs, env):
+    samples = []
+    code = FIRST_FRAME.format(width=width, height=height, mines=mines, array=array,
+                              tile_size=tile_size(width, height))
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        samples.append(float(out.stdout.split()[-1]))
+    return samples
+
+
+def restart_latency(width, height, mines, array, runs):
+    # Samples of getting a fresh board ready (made on the spot, or taken
+    # from a pool that has caught up), of drawing it, and of the first click
+    import pygame
+    import main
+    from board import GameBoard, ArrayGameBoard
+    from pregen import BoardPool
+
+    main.N_TILES_X, main.N_TILES_Y, main.N_MINES = width, height, mines
+    main.TILE_SIZE = tile_size(width, height)
+    main.GRID_HEIGHT = height * main.TILE_SIZE
+    board_class = ArrayGameBoard if array else GameBoard
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((width * main.TILE_SIZE, main.GRID_HEIGHT))
+    renderer = main.GameRenderer(screen, board_class(width, height, mines, seed=0))
+    renderer.draw()
+
+    direct, pooled, draws, clicks = [], [], [], []
+    for seed in range(runs):
+        start = time.perf_counter()
+        board = board_class(width, height, mines, seed=seed)
+        direct.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        renderer.board = board
+        renderer.draw()
+        draws.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        board.reveal_tile(width // 2, height // 2)
+        clicks.append(time.perf_counter() - start)
+
+    pool = BoardPool(board_class, width, height, mines, size=2)
+    for _ in range(runs):
+        for seed, future in pool.ready:
+            future.result()  # the pool has had time to catch up between restarts
+        start = time.perf_counter()
+        seed, board = pool.take()
+        pooled.append(time.perf_counter() - start)
+    pool.close()
+    pygame.quit()
+    return direct, pooled, draws, clicks
+
+
+def report(name, samples):
+    print(f"{name:28} median {1000 * statistics.median(samples):9.2f}ms  "
+          f"min {1000 * min(samples):9.2f}ms  max {1000 * max(samples):9.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first frame and RESTART latency.")
+    parser.add_argument("--size", default="10x15", help="board size, e.g. 1000x1000")
+    parser.add_argument("--mines", type=int, default=20)
+    parser.add_argument("--array", action="store_true", help="use the numpy-backed board")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--headless", action="store_true", help="use SDL's dummy video driver")
+    args = parser.parse_args()
+
+    width, height = (int(n) for n in args.size.split("x"))
+    env = dict(os.environ)
+    if args.headless:
+        env["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+    print(f"{width}x{height}, {args.mines} mines, {'ArrayGameBoard' if args.array else 'GameBoard'}")
+    report("time to first frame", time_to_first_frame(width, height, args.mines, args.array, args.runs, env))
+    direct, pooled, draws, clicks = restart_latency(width, height, args.mines, args.array, args.runs)
+    report("restart board, made now", direct)
+    report("restart board, from pool", pooled)
+    report("restart redraw", draws)
+    report("first click", clicks)
+
+
+if __name__ == "__main__":
+    main()
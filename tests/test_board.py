@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from board import GameBoard, ArrayGameBoard, np
+
+BOARD_CLASSES = [GameBoard, pytest.param(ArrayGameBoard, marks=pytest.mark.skipif(np is None, reason="needs numpy"))]
+
+
+def flag_counts(board):
+    rows = [sum(map(bool, row)) for row in board.flagged]
+    cols = [sum(bool(board.flagged[y][x]) for y in range(board.height)) for x in range(board.width)]
+    return rows, cols
+
+
+@pytest.mark.parametrize("board_class", BOARD_CLASSES)
+def test_rows_pulled_in_clear_their_flags_from_the_counts(board_class):
+    # revealed and flagged cells (as cheat() makes) above an open board:
+    # the top chunk falls all the way and every row is replaced
+    board = board_class(4, 5, 0, seed=1)
+    board.reveal_tile(1, 1)
+    for x in range(4):
+        board._set_flagged(x, 2, True)
+    board._set_flagged(0, 4, True)
+    board.enact_gravity()
+    assert (board.row_flags, board.col_flags) == flag_counts(board)
+    assert board.full_rows == set() and board.full_cols == set()
+
+
+@pytest.mark.parametrize("board_class", BOARD_CLASSES)
+@pytest.mark.parametrize("seed", range(20))
+def test_flag_counts_survive_cheat_and_gravity(board_class, seed):
+    rng = random.Random(seed)
+    board = board_class(10, 15, 20, seed=seed)
+    board.reveal_tile(rng.randrange(10), rng.randrange(15))
+    board.cheat()
+    for _ in range(5):
+        board.enact_gravity()
+        assert (board.row_flags, board.col_flags) == flag_counts(board)
+        full = {y for y, n in enumerate(board.row_flags) if n == board.width}
+        assert board.full_rows == full
+        board.blast()
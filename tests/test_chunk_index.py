@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from board import GameBoard, ArrayGameBoard, ChunkIndex, max_mines, np
+
+# Random reveal / flag / blast / gravity steps on seeded boards, checking
+# the incrementally kept chunk index against one built from scratch, and
+# that the list and numpy boards end up in the same state.
+
+BOARD_CLASSES = [GameBoard, pytest.param(ArrayGameBoard, marks=pytest.mark.skipif(np is None, reason="needs numpy"))]
+
+
+def play_step(board, rng):
+    x, y = rng.randrange(board.width), rng.randrange(board.height)
+    op = rng.random()
+    if op < 0.35:
+        board.reveal_tile(x, y)
+    elif op < 0.65:
+        board.space_bar_tile(x, y)
+    elif op < 0.85:
+        board.enact_gravity()
+    else:
+        board.blast()
+
+
+def partition(index):
+    return {frozenset(cells) for cells in index.cells.values()}
+
+
+def state(board):
+    return ([[cell if cell == "M" else int(cell) for cell in row] for row in board.grid],
+            [list(map(bool, row)) for row in board.revealed],
+            [list(map(bool, row)) for row in board.flagged],
+            board.score, board.game_over)
+
+
+@pytest.mark.parametrize("board_class", BOARD_CLASSES)
+@pytest.mark.parametrize("seed", range(40))
+def test_chunk_index_matches_fresh_build(board_class, seed):
+    rng = random.Random(seed)
+    width, height = rng.randint(2, 16), rng.randint(2, 16)
+    board = board_class(width, height, rng.randint(0, max_mines(width, height) // 3), seed=seed)
+    board.chunk_index.labels()  # built now, so every step below updates it
+    for step in range(60):
+        if board.game_over:
+            break
+        play_step(board, rng)
+        index = board.chunk_index
+        fresh = ChunkIndex(board)
+        fresh.build()
+        assert partition(index) == partition(fresh), f"step {step}"
+        for lab, cells in index.cells.items():
+            assert all(index.label[y][x] == lab for x, y in cells)
+        labelled = sum(1 for row in index.label for lab in row if lab)
+        assert labelled == sum(len(cells) for cells in index.cells.values())
+
+
+@pytest.mark.skipif(np is None, reason="needs numpy")
+@pytest.mark.parametrize("seed", range(40))
+def test_list_and_array_boards_agree(seed):
+    rng = random.Random(seed)
+    width, height = rng.randint(3, 12), rng.randint(3, 12)
+    mines = rng.randint(0, width * height // 4)
+    boards = [GameBoard(width, height, mines, seed=seed), ArrayGameBoard(width, height, mines, seed=seed)]
+    rngs = [random.Random(seed + 1), random.Random(seed + 1)]
+    for step in range(60):
+        if boards[0].game_over:
+            break
+        for board, step_rng in zip(boards, rngs):
+            play_step(board, step_rng)
+        assert state(boards[0]) == state(boards[1]), f"step {step}"
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+import simulate
+from board import GameBoard, ArrayGameBoard, np
+from solver import Solver
+
+# Seeded games where every flag is right (flags only come from the
+# solver's own mine hints): whatever the solver calls safe must not be a
+# mine and whatever it calls a mine must be one, and the answers kept up
+# incrementally must match a solver started fresh on the same board.
+
+BOARD_CLASSES = [GameBoard, pytest.param(ArrayGameBoard, marks=pytest.mark.skipif(np is None, reason="needs numpy"))]
+
+
+def safe_hidden_cell(board, rng):
+    cells = [(x, y) for y in range(board.height) for x in range(board.width)
+             if not board.revealed[y][x] and not board.flagged[y][x] and board.grid[y][x] != "M"]
+    return rng.choice(cells) if cells else None
+
+
+@pytest.mark.parametrize("board_class", BOARD_CLASSES)
+@pytest.mark.parametrize("seed", range(30))
+def test_solver_is_sound_and_incremental(board_class, seed):
+    rng = random.Random(seed)
+    board = board_class(10, 15, 20, seed=seed)
+    solver = Solver(board)
+    board.reveal_tile(rng.randrange(board.width), rng.randrange(board.height))
+    for step in range(60):
+        if board.game_over:
+            break
+        safe, mines = solver.safe_cells(), solver.mine_cells()
+        assert all(board.grid[y][x] != "M" for x, y in safe), f"step {step}"
+        assert all(board.grid[y][x] == "M" for x, y in mines), f"step {step}"
+        fresh = Solver(board)
+        assert (safe, mines) == (fresh.safe_cells(), fresh.mine_cells()), f"step {step}"
+
+        hint = solver.hint()
+        op = rng.random()
+        if hint is not None and op < 0.6:
+            action, (x, y) = hint
+            if action == "reveal":
+                board.reveal_tile(x, y)
+            else:
+                board.flag_tile(x, y)
+        elif op < 0.8:
+            cell = safe_hidden_cell(board, rng)
+            if cell is None:
+                break
+            board.reveal_tile(*cell)
+        elif op < 0.9:
+            board.enact_gravity()
+        else:
+            board.blast()
+
+
+@pytest.mark.parametrize("seed", [205, 211])
+def test_solver_keeps_up_with_gravity_play(seed):
+    # the moves simulate.py's gravity policy makes between hints; seed 211
+    # renumbers hidden cells without touching any constraint around them
+    rng = random.Random(seed)
+    board = GameBoard(10, 15, 20, seed=seed)
+    solver = Solver(board)
+    for step in range(80):
+        if board.game_over:
+            break
+        fresh = Solver(board)
+        assert (solver.safe_cells(), solver.mine_cells()) == (fresh.safe_cells(), fresh.mine_cells()), \
+            f"step {step}"
+        hint = solver.hint()
+        if hint is not None and rng.random() < 0.7:
+            action, (x, y) = hint
+            if action == "reveal":
+                board.reveal_tile(x, y)
+            else:
+                board.flag_tile(x, y)
+            continue
+        move = simulate.gravity_policy(board, rng)
+        if move is None:
+            break
+        name, args = move[0], move[1:]
+        if name == "reveal":
+            board.reveal_tile(*args)
+        elif name == "space":
+            board.space_bar_tile(*args)
+        elif name == "gravity":
+            board.enact_gravity()
+        elif name == "blast":
+            board.blast()
@@ -0,0 +1,129 @@
+import bisect
+import collections
+import contextlib
+import logging
+import time
+
+# ------------------------
+# Tracing
+# ------------------------
+# Opt-in spans and counters for the board operations. Off by default, and
+# then span() hands back a shared do-nothing context and count() returns
+# straight away, so the instrumented code pays next to nothing:
+#
+#     tracer = tracing.enable()                      # or enable(logging_sink())
+#     board.enact_gravity()
+#     tracer.export()  # {"spans": {name: histogram}, "counters": {name: total}}
+#
+# Span timings are kept as histograms (fixed buckets), not samples, so a
+# long session doesn't grow them. A sink, if given, is also called with
+# every event as sink(kind, name, value): ("span", name, seconds) or
+# ("count", name, n).
+
+HISTOGRAM_EDGES_MS = [0.01 * 2 ** i for i in range(21)]  # 0.01ms .. ~10s, doubling
+
+logger = logging.getLogger("minesweeper")
+
+_tracer = None  # the active Tracer, None while tracing is off
+_off = contextlib.nullcontext()
+
+
+class Tracer:
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.spans = {}  # name -> [count, total seconds, bucket counts]
+        self.counters = collections.Counter()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        if name not in self.spans:
+            self.spans[name] = [0, 0.0, [0] * (len(HISTOGRAM_EDGES_MS) + 1)]
+        stats = self.spans[name]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2][bisect.bisect_left(HISTOGRAM_EDGES_MS, 1000 * seconds)] += 1
+        if self.sink is not None:
+            self.sink("span", name, seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+        if self.sink is not None:
+            self.sink("count", name, n)
+
+    def histograms(self):
+        # name -> count, total and (upper edge in ms, count) per non-empty
+        # bucket; the last edge is None for everything slower than the rest
+        edges = HISTOGRAM_EDGES_MS + [None]
+        return {
+            name: {
+                "count": count,
+                "total_ms": 1000 * total,
+                "buckets": [(edge, n) for edge, n in zip(edges, buckets) if n],
+            }
+            for name, (count, total, buckets) in sorted(self.spans.items())
+        }
+
+    def export(self):
+        return {"spans": self.histograms(), "counters": dict(self.counters)}
+
+    def report(self):
+        lines = []
+        for name, histogram in self.histograms().items():
+            mean = histogram["total_ms"] / histogram["count"]
+            lines.append(f"{name:16} x{histogram['count']:<6} mean {mean:.3f}ms")
+            for edge, n in histogram["buckets"]:
+                label = f"<= {edge:g}ms" if edge is not None else "slower"
+                lines.append(f"    {label:>14} {n}")
+        for name, n in sorted(self.counters.items()):
+            lines.append(f"{name:16} {n}")
+        return "\n".join(lines)
+
+
+def enable(sink=None):
+    global _tracer
+    _tracer = Tracer(sink)
+    return _tracer
+
+
+def disable():
+    # Stops tracing and returns the tracer that was active, if any
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def active():
+    return _tracer
+
+
+def span(name):
+    if _tracer is None:
+        return _off
+    return _tracer.span(name)
+
+
+def record(name, seconds):
+    # a span timed by the caller, for work that doesn't fit in a with block
+    if _tracer is not None:
+        _tracer.record(name, seconds)
+
+
+def count(name, n=1):
+    if _tracer is not None:
+        _tracer.count(name, n)
+
+
+def logging_sink(log=logger, level=logging.DEBUG):
+    def sink(kind, name, value):
+        if kind == "span":
+            log.log(level, "%s took %.3fms", name, 1000 * value)
+        else:
+            log.log(level, "%s +%d", name, value)
+    return sink